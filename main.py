@@ -1,9 +1,16 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import json
+import io
 import os
 import plotly.express as px
 
+try:
+    import orjson   # Faster (C) JSON parsing/serialising, if installed
+except ImportError:
+    orjson= None
+
 st.set_page_config(page_title="Finance App", page_icon="💰", layout="wide")
 
 # Streamlit has states, everytime do anything, 
@@ -11,94 +18,190 @@ st.set_page_config(page_title="Finance App", page_icon="💰", layout="wide")
 
 category_file= "categories.json"
 log_file= "log.json"
+page_size= 100      # Rows sent to the data editor at a time
+
+# mtime is only part of the cache key, so the file is re-read once it changes
+@st.cache_data
+def load_json(path, mtime):
+    with open(path, "rb") as f:
+        data= f.read()
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def write_json(path, obj):
+    data= orjson.dumps(obj) if orjson else json.dumps(obj).encode()
+    with open(path, "wb") as f:
+        f.write(data)
 
 # Creating new state, Categories
 # By default, we have a dictionary with one key "Uncategorized" and an empty list
+# Files are only read once per session, reruns reuse what is in state
 if "categories" not in st.session_state:
     st.session_state.categories = {
         "Uncategorized": []
     }
 
-if os.path.exists(category_file):
-    with open(category_file, "r") as f:
-        st.session_state.categories = json.load(f)
+    if os.path.exists(category_file):
+        st.session_state.categories = load_json(category_file, os.path.getmtime(category_file))
+
+# Bumped whenever a category is added, so derived values know to rebuild
+if "categories_version" not in st.session_state:
+    st.session_state.categories_version = 0
 
 
 if "matched" not in st.session_state:
     st.session_state.matched = {cat: [] for cat in st.session_state.categories}
-elif os.path.exists(log_file):
-    with open(log_file, "r") as f:
+
+    if os.path.exists(log_file):
         try:
-            st.session_state.matched = json.load(f)
-        except json.JSONDecodeError:
-            st.session_state.matched = {cat: [] for cat in st.session_state.categories}
+            st.session_state.matched = load_json(log_file, os.path.getmtime(log_file))
+        except json.JSONDecodeError:    # orjson's decode error subclasses this one
+            pass    # Keep the empty log
+
+# Selectbox options for the data editor, rebuilt only after a new category
+def category_options():
+    if st.session_state.get("category_options_version") != st.session_state.categories_version:
+        st.session_state.category_options= tuple(st.session_state.categories)
+        st.session_state.category_options_version= st.session_state.categories_version
+    return st.session_state.category_options
+
+# Keep the shown page's unsaved category edits before the page changes,
+# Streamlit drops the state of editors that are no longer rendered
+def stash_page_edits():
+    page= st.session_state.get("shown_page", 1)
+    editor= st.session_state.get(f"category_editor_{page}", {})
+    start= (page - 1) * page_size
+    for row, changes in editor.get("edited_rows", {}).items():
+        if "Category" in changes:
+            st.session_state.pending_categories[start + int(row)]= changes["Category"]
 
 def save_categories():
-    with open(category_file, "w") as f:
-        json.dump(st.session_state.categories, f)
+    write_json(category_file, st.session_state.categories)
 
 def save_log():
-    with open(log_file, "w") as f:
-        json.dump(st.session_state.matched, f)
-
-def categorize_transaction(df):
+    # Skip the write when nothing matched differently since the last save
+    matched_hash= hash(json.dumps(st.session_state.matched, sort_keys=True))
+    if st.session_state.get("matched_hash") == matched_hash:
+        return
+
+    write_json(log_file, st.session_state.matched)
+    st.session_state.matched_hash= matched_hash
+
+# Cached on the categories' JSON, so reruns reuse the lowercased keywords
+# until a category or keyword actually changes
+# cache_resource hands back the same dict instead of a copy, it is only read
+# Old categories versions are never needed again, so keep only a few
+@st.cache_resource(max_entries=4)
+def build_keyword_index(categories_json):
+    # keyword -> every category listing it (in category order), built once
+    # so each detail is looked up once
+    # Save Changes never removes the old keyword, so duplicates are common
+    categories= json.loads(categories_json)
+    index= {}
+    for category, keywords in categories.items():
+        if category == "Uncategorized":
+            continue
+        for keyword in keywords:
+            index.setdefault(keyword.strip().lower(), {})[category]= None
+    return {keyword: tuple(cats) for keyword, cats in index.items()}
+
+# Returns the normalized details and the category each one maps to (or NaN)
+# Later categories win, same as the old per-category loop
+def match_details(details, keyword_index):
+    # Lowercase once, instead of once per row per category
+    # A plain comprehension over the array skips the .str accessor overhead
+    lowered= pd.Series(
+        [v.lower().strip() if isinstance(v, str) else "" for v in details.to_numpy()],
+        index= details.index,
+        dtype= object,
+    )
+    winners= {keyword: cats[-1] for keyword, cats in keyword_index.items()}
+    return lowered, lowered.map(winners)
+
+# Pure (no session state), so its result can be cached by parse_transactions
+def categorize_transaction(df, categories):
 
-    if "Details" not in df.columns:
-        st.warning("The uploaded file does not contain a 'Details' column.")
-        return df
-    
     # Reinitialize matched properly with all categories present
-    st.session_state.matched = {cat: [] for cat in st.session_state.categories}
-
-    # new category col with default val
-    df["Category"]= "Uncategorized"
-
-    for category, keywords in st.session_state.categories.items():
+    matched = {cat: [] for cat in categories}
 
-        # skip
-        if category == "Uncategorized" or not keywords:
-            continue
-
-        lowered_keywords= [keyword.strip().lower() for keyword in keywords]
+    # One lookup per row instead of scanning every category
+    keyword_index= build_keyword_index(json.dumps(categories))
+    details, assigned= match_details(df["Details"], keyword_index)
+    df["Category"]= assigned.fillna("Uncategorized")
 
-        # Match keywords for each category
-        for idx, row in df.iterrows():
-            detail= row["Details"].lower().strip()
-            if detail in lowered_keywords:
-                df.loc[idx, "Category"]= category
-                
-                # Log the matched detail (not in keyword list)
-                st.session_state.matched[category].append(detail)
-                # break   # Gets the first match
+    # Log each detail under every category listing it, not only the winner,
+    # same as the old per-category loop
+    logged= pd.DataFrame({"detail": details, "category": details.map(keyword_index)})
+    logged= logged.explode("category").dropna()
+    matched.update(logged.groupby("category", sort=False)["detail"].agg(list).to_dict())
 
-    save_log()
-    return df
+    return df, matched
 
+# Only updates state in memory, call save_categories() once after a batch
 def add_keyword_to_category(category, keyword):
     keyword = keyword.strip()
     if keyword and keyword not in st.session_state.categories[category]:
         st.session_state.categories[category].append(keyword)
-        save_categories()
         st.success(f"Keyword '{keyword}' added to category '{category}'")
         return True
     return False
 
 
+# Streamlit reruns everything on each interaction, so parse + categorize
+# only again when the uploaded bytes or the categories change
+# Every saved keyword changes the key, so keep only a few recent entries
+@st.cache_data(show_spinner=False, max_entries=4)
+def parse_transactions(data, categories_json):
+    # Strip the header first, so the conversions below find the clean names
+    columns= [col.strip() for col in pd.read_csv(io.BytesIO(data), nrows=0).columns]
+
+    # Data Cleaning, done by the C parser while reading
+    df = pd.read_csv(
+        io.BytesIO(data),
+        names= columns,
+        header= 0,
+        thousands= ",",
+        parse_dates= ["Date"],
+        date_format= "%d %b %Y",
+        skipinitialspace= True,
+        dtype= {"Details": "string", "Debit/Credit": "category"},
+    )
+
+    # read_csv leaves a column as text when a value doesn't parse (or the file
+    # has no rows), convert those the old way so bad values still raise
+    if not pd.api.types.is_numeric_dtype(df["Amount"]):
+        df["Amount"]= df["Amount"].astype(str).str.replace(",", "").astype(float)
+    if not pd.api.types.is_datetime64_any_dtype(df["Date"]):
+        df["Date"]= pd.to_datetime(df["Date"], format= "%d %b %Y")
+
+    if "Details" not in df.columns:
+        return df, None
+    return categorize_transaction(df, json.loads(categories_json))
+
 def load_transaction(file):
     try:
-        df = pd.read_csv(file)
-
-        # Data Cleaning
-        df.columns= [col.strip() for col in df.columns]
-        df["Amount"]= df["Amount"].str.replace(",", "").astype(float)
-        df["Date"]= pd.to_datetime(df["Date"], format= "%d %b %Y")
+        df, matched= parse_transactions(file.getvalue(), json.dumps(st.session_state.categories))
 
         st.write(df.head(10))
-        return categorize_transaction(df)
+        if matched is None:
+            st.warning("The uploaded file does not contain a 'Details' column.")
+        else:
+            st.session_state.matched= matched
+            save_log()
+        return df
     except Exception as e:
         st.error(f"Error processing the file : {str(e)}")
         return None
 
+# Only regroup and rebuild the pie chart when categories/amounts change,
+# not on every widget interaction
+@st.cache_data(show_spinner=False)
+def summarize_expenses(expenses):
+    category_totals= expenses.groupby("Category")["Amount"].sum().reset_index()
+    category_totals= category_totals.sort_values(by="Amount", ascending=False)
+
+    fig = px.pie(category_totals, values='Amount', names='Category', title='Expenses by Category')
+    return category_totals, fig
+
 def main():
     st.title("Financial Dashboard")
 
@@ -109,11 +212,19 @@ def main():
 
         if df is not None:
             # New DF only for debits and credits
-            debits_df= df[df["Debit/Credit"]== "Debit"].copy()
-            credits_df= df[df["Debit/Credit"]== "Credit"].copy()
+            # One groupby pass splits both, each part is already its own frame
+            parts= dict(list(df.groupby("Debit/Credit", observed=True, sort=False)))
+            credits_df= parts.get("Credit", df.iloc[0:0])
 
              # Store DF in section storage for edited_df (so that it wont change the main df)
-            st.session_state.debits_df= debits_df.copy() 
+            st.session_state.debits_df= parts.get("Debit", df.iloc[0:0]).reset_index(drop=True)
+
+            # Unsaved edits from other pages (position in debits_df -> category),
+            # only valid for the file they were made on
+            file_key= (uploaded_file.name, uploaded_file.size)
+            if st.session_state.get("pending_file") != file_key:
+                st.session_state.pending_categories= {}
+                st.session_state.pending_file= file_key
 
             tab1, tab2 = st.tabs(["Expenses (Debits)", "Payments (Credits)"])
             with tab1:
@@ -123,6 +234,7 @@ def main():
                 if add_button and new_category:
                     if new_category not in st.session_state.categories:
                         st.session_state.categories[new_category]= []
+                        st.session_state.categories_version += 1
                         save_categories()
                         st.rerun()      # This will refresh the page and show the new category
                     else:
@@ -130,42 +242,74 @@ def main():
 
                 st.subheader("Expenses (Debits)")
 
+                # Only send one page of rows to the browser on each rerun
+                page_count= max(1, -(-len(st.session_state.debits_df) // page_size))
+                page= st.number_input(
+                    "Page", min_value=1, max_value=page_count, step=1, on_change=stash_page_edits
+                ) if page_count > 1 else 1
+                st.session_state.shown_page= page
+                start= (page - 1) * page_size
+                page_df= st.session_state.debits_df.iloc[start:start + page_size]
+
+                # Show edits made on this page before switching away from it
+                shown_df= page_df[["Date", "Details", "Amount", "Category"]]
+                pending= st.session_state.pending_categories
+                on_page= [pos for pos in pending if start <= pos < start + page_size]
+                if on_page:
+                    shown_df= shown_df.copy()
+                    shown_df.iloc[[pos - start for pos in on_page], shown_df.columns.get_loc("Category")]= [pending[pos] for pos in on_page]
+
                 edited_df= st.data_editor(
-                    st.session_state.debits_df[["Date", "Details", "Amount", "Category"]],
+                    shown_df,
                     column_config={
                         "Date": st.column_config.DateColumn("Date", format= "DD/MM/YYYY"),
                         "Details": st.column_config.TextColumn("Details"),
                         "Amount": st.column_config.NumberColumn("Amount", format="%.2f $"),
-                        "Category": st.column_config.SelectboxColumn("Category", options=list(st.session_state.categories.keys()))
+                        "Category": st.column_config.SelectboxColumn("Category", options=category_options())
                     },
                     hide_index=True,
                     use_container_width=True,
-                    key= "category_editor",     # Just to identify the DF
+                    key= f"category_editor_{page}",     # Just to identify the DF (one per page)
                 )
 
                 save_button= st.button("Save Changes", type="primary")
                 if save_button:
-                    for idx, row in edited_df.iterrows():
-                        # if same pss
-                        new_category= row["Category"]
-                        if new_category == st.session_state.debits_df.loc[idx, "Category"]:
-                            continue
+                    debits_df= st.session_state.debits_df
+
+                    # Edits stashed on other pages, then this page's current ones
+                    others= [pos for pos in pending if not start <= pos < start + page_size]
+                    here= np.where(edited_df["Category"].to_numpy(dtype=object) != page_df["Category"].to_numpy(dtype=object))[0]
+
+                    # Positions in the page are offset by where the page starts
+                    positions= np.concatenate([np.array(others, dtype=int), start + here])
+                    new_categories= np.array([pending[pos] for pos in others] + list(edited_df["Category"].to_numpy(dtype=object)[here]), dtype=object)
+                    details= np.array(list(debits_df["Details"].to_numpy(dtype=object)[others]) + list(edited_df["Details"].to_numpy(dtype=object)[here]), dtype=object)
+
+                    # Only rows whose category was actually changed
+                    changed= new_categories != debits_df["Category"].to_numpy(dtype=object)[positions]
+                    positions, new_categories, details= positions[changed], new_categories[changed], details[changed]
 
-                        details= row["Details"]
-                        st.session_state.debits_df.loc[idx, "Category"]= new_category
-                        add_keyword_to_category(new_category, details)
+                    category_col= debits_df.columns.get_loc("Category")
+                    debits_df.iloc[positions, category_col]= new_categories
+                    st.session_state.pending_categories= {}
+
+                    added= False
+                    for new_category, detail in zip(new_categories, details):
+                        added |= add_keyword_to_category(new_category, detail)
+
+                    # One write for the whole batch of new keywords
+                    if added:
+                        save_categories()
 
                 # Expense Summary by Category
                 st.subheader("Expense Summary by Category")
-                category_totals= st.session_state.debits_df.groupby("Category")["Amount"].sum().reset_index()
-                category_totals= category_totals.sort_values(by="Amount", ascending=False)
+                category_totals, fig= summarize_expenses(st.session_state.debits_df[["Category", "Amount"]])
 
                 st.dataframe(category_totals, column_config={
                     "Amount": st.column_config.NumberColumn("Amount", format="%.2f $"),
                 }, use_container_width=True, hide_index=True)
 
                 # Plotting
-                fig = px.pie(category_totals, values='Amount', names='Category', title='Expenses by Category')
                 st.plotly_chart(fig, use_container_width=True)
 
             with tab2: